@@ -8,21 +8,55 @@ like before, but with structured logging and resiliency improvements.
 from __future__ import annotations
 
 import argparse
+import asyncio
+import atexit
 import csv
+import importlib.util
+import json
 import logging
+import logging.handlers
 import os
+import queue
 import re
 import sys
 import time
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Iterable, Optional
+from urllib.parse import urlsplit
 
 import requests
-from bs4 import BeautifulSoup
 from requests.adapters import HTTPAdapter
+from selectolax.lexbor import LexborHTMLParser
 from urllib3.util import Retry
 
+# Fast path: the counter sits in a known div, so a single regex over the raw
+# HTML avoids building a DOM at all. Anchored to the class attribute on the
+# left and the "people viewed" text on the right so a mention of the class
+# name in inline JS/CSS can't match; anything unexpected (extra text between
+# the tag and the number, shifted markup) misses and takes the DOM fallback.
+_FAST_RE = re.compile(
+    rb'class="[^"]*\bwpem-viewed-event\b[^"]*"[^>]*>'
+    rb'\s*(?:<[^>]*>\s*)*(\d+)\s+people\s+viewed',
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Anchors to the last number in the element text to reduce false positives.
+_COUNTER_RE = re.compile(r"(\d+)(?!.*\d)")
+
+# Stop running the incremental fast-path match once this much of the body has
+# been buffered; past this point just drain the stream and use the fallback.
+_STREAM_SCAN_LIMIT = 512 * 1024
+
+# After a fast-path hit, read up to this much more body so requests marks the
+# response consumed and returns the keep-alive socket to the pool; a truly
+# oversized remainder is still abandoned (costing the connection).
+_DRAIN_LIMIT = 2 * 1024 * 1024
+
+# Batch mode: never hit a single host with more than this many requests at
+# once, regardless of the overall --concurrency setting.
+_PER_HOST_CONCURRENCY = 4
+
 DEFAULT_URL = "https://ungvetenskapssport.se/event/robotiklager-norrkoping-2026/"
 DEFAULT_OUT_CSV = "data/visitor_counter.csv"
 DEFAULT_USER_AGENT = (
@@ -31,6 +65,28 @@ DEFAULT_USER_AGENT = (
 )
 
 
+# Environment snapshot taken at import, so config resolution (per iteration in
+# daemon mode) reads a plain dict instead of going through os.environ.
+_ENV = dict(os.environ)
+
+
+def _pick(arg_val, env_name: str, default):
+    """Choose arg value, else non-empty env, else default."""
+    if arg_val not in (None, ""):
+        return arg_val
+    env_val = _ENV.get(env_name)
+    if env_val not in (None, ""):
+        return env_val
+    return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(_ENV.get(name, default))
+    except ValueError:
+        return default
+
+
 @dataclass
 class ScrapeConfig:
     url: str = DEFAULT_URL
@@ -40,74 +96,280 @@ class ScrapeConfig:
     read_timeout: float = 30.0
     retries: int = 3
     backoff: float = 1.5
+    http2: bool = False
 
     @classmethod
     def from_env_and_args(cls, args: argparse.Namespace) -> "ScrapeConfig":
-        def pick(arg_val, env_name: str, default):
-            """Choose arg value, else non-empty env, else default."""
-            if arg_val not in (None, ""):
-                return arg_val
-            env_val = os.getenv(env_name)
-            if env_val not in (None, ""):
-                return env_val
-            return default
-
-        def env_float(name: str, default: float) -> float:
-            try:
-                return float(os.getenv(name, default))
-            except ValueError:
-                return default
-
         return cls(
-            url=pick(args.url, "SCRAPER_URL", DEFAULT_URL),
-            out_csv=pick(args.out, "SCRAPER_OUT_CSV", DEFAULT_OUT_CSV),
-            user_agent=pick(args.user_agent, "SCRAPER_USER_AGENT", DEFAULT_USER_AGENT),
-            connect_timeout=env_float("SCRAPER_CONNECT_TIMEOUT", args.connect_timeout or 10.0),
-            read_timeout=env_float("SCRAPER_READ_TIMEOUT", args.read_timeout or 30.0),
-            retries=int(os.getenv("SCRAPER_RETRIES", args.retries or 3)),
-            backoff=env_float("SCRAPER_BACKOFF", args.backoff or 1.5),
+            url=_pick(args.url, "SCRAPER_URL", DEFAULT_URL),
+            out_csv=_pick(args.out, "SCRAPER_OUT_CSV", DEFAULT_OUT_CSV),
+            user_agent=_pick(args.user_agent, "SCRAPER_USER_AGENT", DEFAULT_USER_AGENT),
+            connect_timeout=_env_float("SCRAPER_CONNECT_TIMEOUT", args.connect_timeout or 10.0),
+            read_timeout=_env_float("SCRAPER_READ_TIMEOUT", args.read_timeout or 30.0),
+            retries=int(_ENV.get("SCRAPER_RETRIES", args.retries or 3)),
+            backoff=_env_float("SCRAPER_BACKOFF", args.backoff or 1.5),
+            http2=bool(args.http2)
+            or _ENV.get("SCRAPER_HTTP2", "").lower() in ("1", "true", "yes"),
         )
 
 
-def configure_logging(verbose: bool = False):
-    logging.basicConfig(
-        level=logging.DEBUG if verbose else logging.INFO,
-        format="%(asctime)sZ %(levelname)s %(message)s",
-        datefmt="%Y-%m-%dT%H:%M:%S",
-    )
+def configure_logging(verbose: bool = False, off_thread: bool = False):
+    # Skip per-record thread/process lookups; swallow handler errors.
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.raiseExceptions = False
+
     # Force UTC timestamps
     logging.Formatter.converter = time.gmtime
 
-
-def extract_counter(html: str) -> Optional[int]:
+    level = logging.DEBUG if verbose else logging.INFO
+    fmt = "%(asctime)sZ %(levelname)s %(message)s"
+    datefmt = "%Y-%m-%dT%H:%M:%S"
+
+    if not off_thread:
+        logging.basicConfig(level=level, format=fmt, datefmt=datefmt)
+        return
+
+    # Daemon/batch mode: hand records to a QueueHandler and do the actual
+    # formatting and I/O on a background listener thread, off the hot path.
+    # Like basicConfig, this is a no-op once the root logger has handlers, so
+    # repeated in-process main() calls don't stack handlers and listeners.
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    q: queue.Queue = queue.Queue(-1)
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter(fmt, datefmt))
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(q))
+    listener = logging.handlers.QueueListener(q, stream)
+    listener.start()
+    atexit.register(listener.stop)
+
+
+def extract_counter(html: bytes) -> Optional[int]:
     """Extract visitor counter integer from the event page.
 
     The selector targets the WordPress Events Manager counter element. The regex
-    anchors to the last number in the string to reduce false positives.
+    anchors to the last number in the string to reduce false positives. Parsing
+    uses selectolax's Lexbor engine, which keeps the tree in C memory and is an
+    order of magnitude faster than BeautifulSoup with html.parser.
+
+    A compiled regex over the raw HTML handles the common case without any
+    tokenization or tree build; the Lexbor parse only runs when it misses.
+
+    Works on undecoded bytes so the common path never pays a full-page
+    charset-detect and decode; Lexbor accepts bytes directly in the fallback.
     """
 
-    soup = BeautifulSoup(html, "html.parser")
-    el = soup.select_one("div.wpem-viewed-event")
-    if not el:
-        return None
+    m = _FAST_RE.search(html)
+    if m:
+        return int(m.group(1))
 
-    text = el.get_text(" ", strip=True)
-    m = re.search(r"(\d+)(?!.*\d)", text)
-    return int(m.group(1)) if m else None
+    tree = LexborHTMLParser(html)
+    for node in tree.tags("div"):
+        classes = node.attributes.get("class") or ""
+        if "wpem-viewed-event" in classes.split():
+            text = node.text(deep=True, separator=" ", strip=True)
+            m = _COUNTER_RE.search(text)
+            return int(m.group(1)) if m else None
+    return None
 
 
-def append_csv(out_csv: str, timestamp_utc: str, value: Optional[int], url: str):
-    os.makedirs(os.path.dirname(out_csv) or ".", exist_ok=True)
-    new_file = not os.path.exists(out_csv)
+# Only advertise Brotli when a decoder is importable; a "br" body without one
+# would be mis-decoded downstream and the counter silently extracted as blank.
+_ACCEPT_ENCODING = (
+    "gzip, deflate, br" if importlib.util.find_spec("brotli") else "gzip, deflate"
+)
+
+
+def build_headers(cfg: ScrapeConfig) -> dict:
+    return {
+        "User-Agent": cfg.user_agent,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Encoding": _ACCEPT_ENCODING,
+        "Accept-Language": "en-GB,en;q=0.9",
+    }
+
+
+# (epoch second, formatted string) cache for utc_timestamp.
+_TS_CACHE: tuple = (-1, "")
+
+
+def utc_timestamp() -> str:
+    """ISO-8601 UTC timestamp at second resolution.
 
-    with open(out_csv, "a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
+    Matches datetime.isoformat(timespec="seconds") output but goes through
+    time.strftime and only reformats when the integer second has changed,
+    which keeps it off the batch/daemon hot path.
+    """
+
+    global _TS_CACHE
+    now = int(time.time())
+    if now != _TS_CACHE[0]:
+        _TS_CACHE = (now, time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(now)))
+    return _TS_CACHE[1]
+
+
+def _state_path(out_csv: str) -> str:
+    return os.path.join(os.path.dirname(out_csv) or ".", ".state.json")
+
+
+def _load_state(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(path: str, state: dict):
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+    except OSError as exc:
+        logging.debug("failed to persist scrape state", exc_info=exc)
+
+
+def _drain_response(response: requests.Response, already_read: int):
+    """Finish reading the body so the socket goes back to the keep-alive pool.
+
+    requests only returns a connection to the urllib3 pool once the response
+    is fully consumed; an unread remainder would tear the socket down and
+    defeat daemon-mode connection reuse. Oversized remainders are abandoned.
+    """
+
+    remaining = _DRAIN_LIMIT - already_read
+    for chunk in response.iter_content(chunk_size=65536):
+        remaining -= len(chunk)
+        if remaining <= 0:
+            return
+
+
+def fetch_counter(
+    session: requests.Session,
+    cfg: ScrapeConfig,
+    headers: dict,
+    state: Optional[dict] = None,
+) -> Optional[int]:
+    """Fetch the event page and extract the counter, stopping the scan early.
+
+    The body is streamed in chunks and the fast-path regex runs on the growing
+    buffer; on WordPress pages the counter div appears well before the footer,
+    so most runs stop parsing long before the full page. The remainder is
+    still drained (up to a cap) so the connection is reused, not torn down.
+
+    When a state dict with the previous ETag/Last-Modified is passed, a 304
+    response skips parsing entirely and the cached value is reused; on 200 the
+    validators and value are written back into the dict.
+    """
+
+    with session.get(
+        cfg.url,
+        headers=headers,
+        stream=True,
+        timeout=(cfg.connect_timeout, cfg.read_timeout),
+    ) as response:
+        if state is not None and response.status_code == 304:
+            response.content  # consume the empty 304 body so the socket is pooled
+            logging.debug("page not modified; reusing cached value")
+            return state.get("last_value")
+        response.raise_for_status()
+
+        buf = bytearray()
+        value = None
+        for chunk in response.iter_content(chunk_size=65536):
+            buf += chunk
+            if len(buf) <= _STREAM_SCAN_LIMIT:
+                m = _FAST_RE.search(buf)
+                if m:
+                    value = int(m.group(1))
+                    _drain_response(response, len(buf))
+                    break
+        else:
+            value = extract_counter(bytes(buf))
+
+        if state is not None:
+            state["url"] = cfg.url
+            state["etag"] = response.headers.get("ETag")
+            state["last_modified"] = response.headers.get("Last-Modified")
+            state["last_value"] = value
+        return value
+
+
+# CSV paths appended to this process, fsynced once at clean shutdown. The data
+# is low-value observability output, so durability-under-crash is traded for
+# not paying a sync on every append.
+_WRITTEN_CSVS: set = set()
+
+
+def _sync_csvs():
+    for path in _WRITTEN_CSVS:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+atexit.register(_sync_csvs)
+
+
+@lru_cache(maxsize=None)
+def _csv_escape(field: str) -> str:
+    """Quote a field per RFC 4180, only when needed. Cached: the URL repeats."""
+
+    if any(c in field for c in ',"\r\n'):
+        return '"' + field.replace('"', '""') + '"'
+    return field
+
+
+# Paths whose directory and header are known to exist; steady-state appends in
+# daemon/batch mode then skip the makedirs and exists stat calls.
+_CSV_READY: set = set()
+
+
+def append_csv_rows(out_csv: str, rows: Iterable[tuple]):
+    """Append (timestamp_utc, value, url) rows with a single open/close."""
+
+    new_file = False
+    if out_csv not in _CSV_READY:
+        os.makedirs(os.path.dirname(out_csv) or ".", exist_ok=True)
+        new_file = not os.path.exists(out_csv)
+
+    with open(out_csv, "a", newline="", encoding="utf-8", buffering=1 << 16) as f:
         if new_file:
-            w.writerow(["timestamp_utc", "value", "url"])
-        w.writerow([timestamp_utc, value, url])
+            csv.writer(f).writerow(["timestamp_utc", "value", "url"])
+        # The three fields are fully controlled (ISO timestamp, int-or-blank,
+        # escaped URL), so an f-string per row beats csv.writer's Python-level
+        # dialect handling. \r\n matches the csv default used for the header.
+        f.write(
+            "".join(
+                f"{ts},{'' if value is None else value},{_csv_escape(url)}\r\n"
+                for ts, value, url in rows
+            )
+        )
+    _CSV_READY.add(out_csv)
+    _WRITTEN_CSVS.add(out_csv)
+
+
+def append_csv(out_csv: str, timestamp_utc: str, value: Optional[int], url: str):
+    append_csv_rows(out_csv, [(timestamp_utc, value, url)])
+
+
+# Lazily built, shared across repeated main() calls so keep-alive connections
+# are reused instead of paying a fresh pool per run.
+_SESSION: Optional[requests.Session] = None
 
 
 def build_session(cfg: ScrapeConfig) -> requests.Session:
+    global _SESSION
+    if _SESSION is not None:
+        return _SESSION
+
     session = requests.Session()
     retry = Retry(
         total=cfg.retries,
@@ -118,12 +380,153 @@ def build_session(cfg: ScrapeConfig) -> requests.Session:
         allowed_methods=("GET",),
         raise_on_status=False,
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
+    _SESSION = session
     return session
 
 
+async def _scrape_batch(
+    urls: list[str], cfg: ScrapeConfig, headers: dict, concurrency: int
+) -> list[tuple[str, Optional[int], str]]:
+    """Fetch all URLs concurrently, returning (timestamp, value, url) rows."""
+
+    import aiohttp  # Local import: only the batch path needs it.
+
+    sem = asyncio.Semaphore(concurrency)
+    host_sems: dict[str, asyncio.Semaphore] = {}
+
+    async def fetch_one(session: "aiohttp.ClientSession", url: str):
+        host_sem = host_sems.setdefault(
+            urlsplit(url).netloc, asyncio.Semaphore(_PER_HOST_CONCURRENCY)
+        )
+        async with sem, host_sem:
+            try:
+                async with session.get(url) as resp:
+                    resp.raise_for_status()
+                    body = await resp.read()
+            except aiohttp.ClientError as exc:
+                logging.error("http request failed", exc_info=exc)
+                return utc_timestamp(), None, url
+        return utc_timestamp(), extract_counter(body), url
+
+    timeout = aiohttp.ClientTimeout(
+        connect=cfg.connect_timeout, sock_read=cfg.read_timeout
+    )
+    async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
+        return await asyncio.gather(*(fetch_one(session, url) for url in urls))
+
+
+def do_scrape(session: requests.Session, cfg: ScrapeConfig, headers: dict) -> int:
+    """Run one fetch-extract-append cycle; used by both one-shot and daemon mode."""
+
+    ts = utc_timestamp()
+    state_path = _state_path(cfg.out_csv)
+    state = _load_state(state_path)
+
+    req_headers = headers
+    if state.get("url") == cfg.url:
+        conditional = {}
+        if state.get("etag"):
+            conditional["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            conditional["If-Modified-Since"] = state["last_modified"]
+        if conditional:
+            req_headers = {**headers, **conditional}
+
+    try:
+        if not cfg.url:
+            raise requests.RequestException("Empty URL after config resolution")
+        value = fetch_counter(session, cfg, req_headers, state)
+    except requests.RequestException as exc:
+        logging.error("http request failed", exc_info=exc)
+        return 1
+
+    if value is None:
+        logging.warning("counter element not found or unparsable", extra={"url": cfg.url})
+    else:
+        logging.info("counter extracted", extra={"value": value})
+
+    try:
+        append_csv(cfg.out_csv, ts, value, cfg.url)
+    except OSError as exc:
+        logging.error("failed to write csv", exc_info=exc)
+        return 1
+
+    # After the append: append_csv_rows creates the output directory, and the
+    # state file lives next to the CSV.
+    _save_state(state_path, state)
+
+    logging.info("scrape complete", extra={"timestamp_utc": ts, "value": value})
+    return 0
+
+
+async def _scrape_batch_http2(
+    urls: list[str], cfg: ScrapeConfig, headers: dict, concurrency: int
+) -> list[tuple[str, Optional[int], str]]:
+    """httpx backend: multiplex all batch requests over HTTP/2 connections.
+
+    Streams share a single TLS connection per host, so per-URL handshake cost
+    drops to near-zero. Needs the optional httpx[http2] dependency.
+    """
+
+    import httpx  # Optional dependency: pip install httpx[http2]
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(client: "httpx.AsyncClient", url: str):
+        async with sem:
+            try:
+                resp = await client.get(url)
+                resp.raise_for_status()
+            except httpx.HTTPError as exc:
+                logging.error("http request failed", exc_info=exc)
+                return utc_timestamp(), None, url
+        return utc_timestamp(), extract_counter(resp.content), url
+
+    async with httpx.AsyncClient(
+        http2=True,
+        headers=headers,
+        limits=httpx.Limits(max_keepalive_connections=8),
+        timeout=httpx.Timeout(cfg.read_timeout, connect=cfg.connect_timeout),
+    ) as client:
+        return await asyncio.gather(*(fetch_one(client, url) for url in urls))
+
+
+def run_batch(cfg: ScrapeConfig, batch_file: str, concurrency: int) -> int:
+    """Scrape every URL in batch_file concurrently and append all rows."""
+
+    try:
+        with open(batch_file, encoding="utf-8") as f:
+            urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    except OSError as exc:
+        logging.error("failed to read batch file", exc_info=exc)
+        return 1
+    if not urls:
+        logging.error("batch file contains no URLs", extra={"batch": batch_file})
+        return 1
+
+    headers = build_headers(cfg)
+    backend = _scrape_batch_http2 if cfg.http2 else _scrape_batch
+    try:
+        rows = asyncio.run(backend(urls, cfg, headers, concurrency))
+    except ImportError as exc:
+        hint = "httpx[http2]" if cfg.http2 else "aiohttp"
+        logging.error("batch backend unavailable; pip install %s", hint, exc_info=exc)
+        return 1
+
+    failed = sum(1 for _, value, _ in rows if value is None)
+    try:
+        append_csv_rows(cfg.out_csv, rows)
+    except OSError as exc:
+        logging.error("failed to write csv", exc_info=exc)
+        return 1
+
+    logging.info("batch complete", extra={"urls": len(urls), "failed": failed})
+    return 0 if failed == 0 else 1
+
+
 def parse_args(argv: Iterable[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Log visitor counter for the event page")
     parser.add_argument("--url", help="Event URL to scrape")
@@ -133,6 +536,20 @@ def parse_args(argv: Iterable[str]) -> argparse.Namespace:
     parser.add_argument("--read-timeout", type=float, help="Read timeout seconds")
     parser.add_argument("--retries", type=int, help="Number of retries on failure")
     parser.add_argument("--backoff", type=float, help="Retry backoff factor")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        help="Keep running and scrape every N seconds, reusing one connection",
+    )
+    parser.add_argument("--batch", help="File with one URL per line to scrape concurrently")
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Max in-flight requests in batch mode"
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        help="Multiplex batch requests over HTTP/2 via httpx (needs httpx[http2])",
+    )
     parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
     return parser.parse_args(list(argv))
 
@@ -140,7 +557,10 @@ def parse_args(argv: Iterable[str]) -> argparse.Namespace:
 def main(argv: Iterable[str] | None = None) -> int:
     args = parse_args(argv or sys.argv[1:])
     cfg = ScrapeConfig.from_env_and_args(args)
-    configure_logging(args.verbose)
+    configure_logging(args.verbose, off_thread=bool(args.interval or args.batch))
+
+    if args.batch:
+        return run_batch(cfg, args.batch, args.concurrency)
 
     logging.info(
         "starting scrape",
@@ -155,40 +575,19 @@ def main(argv: Iterable[str] | None = None) -> int:
     )
 
     session = build_session(cfg)
-    headers = {
-        "User-Agent": cfg.user_agent,
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-GB,en;q=0.9",
-    }
-
-    ts = datetime.now(timezone.utc).isoformat(timespec="seconds")
-    try:
-        if not cfg.url:
-            raise requests.RequestException("Empty URL after config resolution")
-        response = session.get(
-            cfg.url,
-            headers=headers,
-            timeout=(cfg.connect_timeout, cfg.read_timeout),
-        )
-        response.raise_for_status()
-    except requests.RequestException as exc:
-        logging.error("http request failed", exc_info=exc)
-        return 1
-
-    value = extract_counter(response.text)
-    if value is None:
-        logging.warning("counter element not found or unparsable", extra={"url": cfg.url})
-    else:
-        logging.info("counter extracted", extra={"value": value})
-
-    try:
-        append_csv(cfg.out_csv, ts, value, cfg.url)
-    except OSError as exc:
-        logging.error("failed to write csv", exc_info=exc)
-        return 1
-
-    logging.info("scrape complete", extra={"timestamp_utc": ts, "value": value})
-    return 0
+    headers = build_headers(cfg)
+
+    if args.interval:
+        # Daemon mode: build the session once and let urllib3 keep the TLS
+        # socket alive, so DNS/TCP/TLS setup is paid on the first scrape only.
+        try:
+            while True:
+                do_scrape(session, cfg, headers)
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            return 0
+
+    return do_scrape(session, cfg, headers)
 
 
 if __name__ == "__main__":  # pragma: no cover